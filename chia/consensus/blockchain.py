@@ -15,7 +15,11 @@ from chia.consensus.cost_calculator import NPCResult
 from chia.consensus.difficulty_adjustment import get_next_sub_slot_iters_and_difficulty
 from chia.consensus.find_fork_point import find_fork_point_in_chain
 from chia.consensus.full_block_to_block_record import block_to_block_record
-from chia.consensus.multiprocess_validation import PreValidationResult, pre_validate_blocks_multiprocessing
+from chia.consensus.multiprocess_validation import (
+    PreValidationResult,
+    _run_generator,
+    pre_validate_blocks_multiprocessing,
+)
 from chia.full_node.block_store import BlockStore
 from chia.full_node.coin_store import CoinStore
 from chia.full_node.mempool_check_conditions import get_name_puzzle_conditions
@@ -523,9 +527,14 @@ class Blockchain(BlockchainInterface):
                 return PreValidationResult(uint16(Err.GENERATOR_REF_HAS_NO_GENERATOR.value), None, None)
             if block_generator is None:
                 return PreValidationResult(uint16(Err.GENERATOR_REF_HAS_NO_GENERATOR.value), None, None)
-            npc_result = get_name_puzzle_conditions(
-                block_generator, min(self.constants.MAX_BLOCK_COST_CLVM, block.transactions_info.cost), False
+            # running the generator is CPU bound, so keep it off the event loop
+            npc_result_bytes = await asyncio.get_running_loop().run_in_executor(
+                self.pool,
+                _run_generator,
+                bytes(block_generator),
+                min(self.constants.MAX_BLOCK_COST_CLVM, block.transactions_info.cost),
             )
+            npc_result = NPCResult.from_bytes(npc_result_bytes)
         error_code, cost_result = await validate_block_body(
             self.constants,
             self,
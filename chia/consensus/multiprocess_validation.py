@@ -122,6 +122,15 @@ def batch_pre_validate_blocks(
     return [bytes(r) for r in results]
 
 
+def _run_generator(block_generator_bytes: bytes, max_cost: int) -> bytes:
+    """
+    Runs a block generator in a worker process. The NPCResult is returned serialized, since it has to cross the
+    process boundary.
+    """
+    block_generator: BlockGenerator = BlockGenerator.from_bytes(block_generator_bytes)
+    return bytes(get_name_puzzle_conditions(block_generator, max_cost, False))
+
+
 async def pre_validate_blocks_multiprocessing(
     constants: ConsensusConstants,
     constants_json: Dict,
@@ -1,17 +1,17 @@
+import logging
 import time
-from typing import Dict, List, Optional, Set
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
 from chia.consensus.cost_calculator import NPCResult
 from chia.full_node.generator import create_generator_args, setup_generator_args
 from chia.types.blockchain_format.coin import Coin
-from chia.types.blockchain_format.program import NIL
+from chia.types.blockchain_format.program import NIL, Program
 from chia.types.blockchain_format.sized_bytes import bytes32
 from chia.types.coin_record import CoinRecord
 from chia.types.condition_with_args import ConditionWithArgs
 from chia.types.generator_types import BlockGenerator
 from chia.types.name_puzzle_condition import NPC
-from chia.util.clvm import int_from_bytes
-from chia.util.condition_tools import ConditionOpcode, conditions_by_opcode
+from chia.util.condition_tools import COND_TABLE, ConditionOpcode
 from chia.util.errors import Err
 from chia.util.ints import uint32, uint64, uint16
 from chia.wallet.puzzles.generator_loader import GENERATOR_FOR_SINGLE_COIN_MOD
@@ -19,19 +19,71 @@ from chia.wallet.puzzles.rom_bootstrap_generator import get_generator
 
 GENERATOR_MOD = get_generator()
 
+log = logging.getLogger(__name__)
+
+# CLVM atoms are big-endian signed integers. Calling the builtin directly
+# avoids the extra python frame of chia.util.clvm.int_from_bytes
+_from_bytes = int.from_bytes
+
+# returned for every generator that fails to run. NPCResult is immutable, so a
+# single instance is shared instead of building a new one each time. Callers
+# must not mutate its (empty) npc_list
+GENERATOR_RUNTIME_ERROR_RESULT = NPCResult(uint16(Err.GENERATOR_RUNTIME_ERROR.value), [], uint64(0))
+
 
 def mempool_assert_announcement(condition: ConditionWithArgs, announcements: Set[bytes32]) -> Optional[Err]:
     """
     Check if an announcement is included in the list of announcements
     """
-    announcement_hash = bytes32(condition.vars[0])
+    # bytes hash and compare equal to the bytes32 in the set, so the raw atom
+    # can be looked up directly
+    announcement_hash = condition.vars[0]
     if announcement_hash not in announcements:
         return Err.ASSERT_ANNOUNCE_CONSUMED_FAILED
 
     return None
 
 
-def mempool_assert_my_coin_id(condition: ConditionWithArgs, unspent: CoinRecord) -> Optional[Err]:
+# The checks below share one signature so mempool_check_conditions_dict can
+# dispatch through HANDLERS. Each one ignores the arguments it doesn't need.
+
+
+def mempool_assert_coin_announcement(
+    condition: ConditionWithArgs,
+    unspent: CoinRecord,
+    coin_announcement_names: Set[bytes32],
+    puzzle_announcement_names: Set[bytes32],
+    prev_transaction_block_height: uint32,
+    timestamp: uint64,
+) -> Optional[Err]:
+    """
+    Check if a coin announcement is included in the coin announcements of the spend
+    """
+    return mempool_assert_announcement(condition, coin_announcement_names)
+
+
+def mempool_assert_puzzle_announcement(
+    condition: ConditionWithArgs,
+    unspent: CoinRecord,
+    coin_announcement_names: Set[bytes32],
+    puzzle_announcement_names: Set[bytes32],
+    prev_transaction_block_height: uint32,
+    timestamp: uint64,
+) -> Optional[Err]:
+    """
+    Check if a puzzle announcement is included in the puzzle announcements of the spend
+    """
+    return mempool_assert_announcement(condition, puzzle_announcement_names)
+
+
+def mempool_assert_my_coin_id(
+    condition: ConditionWithArgs,
+    unspent: CoinRecord,
+    coin_announcement_names: Set[bytes32],
+    puzzle_announcement_names: Set[bytes32],
+    prev_transaction_block_height: uint32,
+    timestamp: uint64,
+) -> Optional[Err]:
     """
     Checks if CoinID matches the id from the condition
     """
@@ -41,13 +93,18 @@ def mempool_assert_my_coin_id(condition: ConditionWithArgs, unspent: CoinRecord)
 
 
 def mempool_assert_absolute_block_height_exceeds(
-    condition: ConditionWithArgs, prev_transaction_block_height: uint32
+    condition: ConditionWithArgs,
+    unspent: CoinRecord,
+    coin_announcement_names: Set[bytes32],
+    puzzle_announcement_names: Set[bytes32],
+    prev_transaction_block_height: uint32,
+    timestamp: uint64,
 ) -> Optional[Err]:
     """
     Checks if the next block index exceeds the block index from the condition
     """
     try:
-        block_index_exceeds_this = int_from_bytes(condition.vars[0])
+        block_index_exceeds_this = _from_bytes(condition.vars[0], "big", signed=True)
     except ValueError:
         return Err.INVALID_CONDITION
     if prev_transaction_block_height < block_index_exceeds_this:
@@ -56,13 +113,18 @@ def mempool_assert_absolute_block_height_exceeds(
 
 
 def mempool_assert_relative_block_height_exceeds(
-    condition: ConditionWithArgs, unspent: CoinRecord, prev_transaction_block_height: uint32
+    condition: ConditionWithArgs,
+    unspent: CoinRecord,
+    coin_announcement_names: Set[bytes32],
+    puzzle_announcement_names: Set[bytes32],
+    prev_transaction_block_height: uint32,
+    timestamp: uint64,
 ) -> Optional[Err]:
     """
     Checks if the coin age exceeds the age from the condition
     """
     try:
-        expected_block_age = int_from_bytes(condition.vars[0])
+        expected_block_age = _from_bytes(condition.vars[0], "big", signed=True)
         block_index_exceeds_this = expected_block_age + unspent.confirmed_block_index
     except ValueError:
         return Err.INVALID_CONDITION
@@ -71,12 +133,19 @@ def mempool_assert_relative_block_height_exceeds(
     return None
 
 
-def mempool_assert_absolute_time_exceeds(condition: ConditionWithArgs, timestamp: uint64) -> Optional[Err]:
+def mempool_assert_absolute_time_exceeds(
+    condition: ConditionWithArgs,
+    unspent: CoinRecord,
+    coin_announcement_names: Set[bytes32],
+    puzzle_announcement_names: Set[bytes32],
+    prev_transaction_block_height: uint32,
+    timestamp: uint64,
+) -> Optional[Err]:
     """
     Check if the current time in seconds exceeds the time specified by condition
     """
     try:
-        expected_seconds = int_from_bytes(condition.vars[0])
+        expected_seconds = _from_bytes(condition.vars[0], "big", signed=True)
     except ValueError:
         return Err.INVALID_CONDITION
 
@@ -88,13 +157,18 @@ def mempool_assert_absolute_time_exceeds(condition: ConditionWithArgs, timestamp
 
 
 def mempool_assert_relative_time_exceeds(
-    condition: ConditionWithArgs, unspent: CoinRecord, timestamp: uint64
+    condition: ConditionWithArgs,
+    unspent: CoinRecord,
+    coin_announcement_names: Set[bytes32],
+    puzzle_announcement_names: Set[bytes32],
+    prev_transaction_block_height: uint32,
+    timestamp: uint64,
 ) -> Optional[Err]:
     """
     Check if the current time in seconds exceeds the time specified by condition
     """
     try:
-        expected_seconds = int_from_bytes(condition.vars[0])
+        expected_seconds = _from_bytes(condition.vars[0], "big", signed=True)
     except ValueError:
         return Err.INVALID_CONDITION
 
@@ -105,7 +179,14 @@ def mempool_assert_relative_time_exceeds(
     return None
 
 
-def mempool_assert_my_parent_id(condition: ConditionWithArgs, unspent: CoinRecord) -> Optional[Err]:
+def mempool_assert_my_parent_id(
+    condition: ConditionWithArgs,
+    unspent: CoinRecord,
+    coin_announcement_names: Set[bytes32],
+    puzzle_announcement_names: Set[bytes32],
+    prev_transaction_block_height: uint32,
+    timestamp: uint64,
+) -> Optional[Err]:
     """
     Checks if coin's parent ID matches the ID from the condition
     """
@@ -114,7 +195,14 @@ def mempool_assert_my_parent_id(condition: ConditionWithArgs, unspent: CoinRecor
     return None
 
 
-def mempool_assert_my_puzzlehash(condition: ConditionWithArgs, unspent: CoinRecord) -> Optional[Err]:
+def mempool_assert_my_puzzlehash(
+    condition: ConditionWithArgs,
+    unspent: CoinRecord,
+    coin_announcement_names: Set[bytes32],
+    puzzle_announcement_names: Set[bytes32],
+    prev_transaction_block_height: uint32,
+    timestamp: uint64,
+) -> Optional[Err]:
     """
     Checks if coin's puzzlehash matches the puzzlehash from the condition
     """
@@ -123,15 +211,63 @@ def mempool_assert_my_puzzlehash(condition: ConditionWithArgs, unspent: CoinReco
     return None
 
 
-def mempool_assert_my_amount(condition: ConditionWithArgs, unspent: CoinRecord) -> Optional[Err]:
+def mempool_assert_my_amount(
+    condition: ConditionWithArgs,
+    unspent: CoinRecord,
+    coin_announcement_names: Set[bytes32],
+    puzzle_announcement_names: Set[bytes32],
+    prev_transaction_block_height: uint32,
+    timestamp: uint64,
+) -> Optional[Err]:
     """
     Checks if coin's amount matches the amount from the condition
     """
-    if unspent.coin.amount != int_from_bytes(condition.vars[0]):
+    if unspent.coin.amount != _from_bytes(condition.vars[0], "big", signed=True):
         return Err.ASSERT_MY_AMOUNT_FAILED
     return None
 
 
+# opcodes without an entry (CREATE_COIN, AGG_SIG_*, RESERVE_FEE, ...) have
+# nothing to check against the coin store
+HANDLERS: Dict[ConditionOpcode, Callable[..., Optional[Err]]] = {
+    ConditionOpcode.ASSERT_MY_COIN_ID: mempool_assert_my_coin_id,
+    ConditionOpcode.ASSERT_COIN_ANNOUNCEMENT: mempool_assert_coin_announcement,
+    ConditionOpcode.ASSERT_PUZZLE_ANNOUNCEMENT: mempool_assert_puzzle_announcement,
+    ConditionOpcode.ASSERT_HEIGHT_ABSOLUTE: mempool_assert_absolute_block_height_exceeds,
+    ConditionOpcode.ASSERT_HEIGHT_RELATIVE: mempool_assert_relative_block_height_exceeds,
+    ConditionOpcode.ASSERT_SECONDS_ABSOLUTE: mempool_assert_absolute_time_exceeds,
+    ConditionOpcode.ASSERT_SECONDS_RELATIVE: mempool_assert_relative_time_exceeds,
+    ConditionOpcode.ASSERT_MY_PARENT_ID: mempool_assert_my_parent_id,
+    ConditionOpcode.ASSERT_MY_PUZZLEHASH: mempool_assert_my_puzzlehash,
+    ConditionOpcode.ASSERT_MY_AMOUNT: mempool_assert_my_amount,
+}
+
+CHECKED_OPS = frozenset(HANDLERS.keys())
+
+
+def _condition_atoms(cond: Program) -> Tuple[Optional[bytes], List[bytes]]:
+    """
+    Splits a condition into its opcode atom and its list of argument atoms. This walks the raw pairs once instead
+    of going through first()/rest(), which allocate a new Program for every step.
+    """
+    pair = cond.pair
+    if pair is None:
+        raise ValueError("condition is not a list")
+    args: List[bytes] = []
+    append = args.append
+    obj = pair[1]
+    while True:
+        arg_pair = obj.pair
+        if arg_pair is None:
+            break
+        atom = arg_pair[0].atom
+        if atom is None:
+            break
+        append(atom)
+        obj = arg_pair[1]
+    return pair[0].atom, args
+
+
 def get_name_puzzle_conditions(generator: BlockGenerator, max_cost: int, safe_mode: bool) -> NPCResult:
     try:
         block_program, block_program_args = setup_generator_args(generator)
@@ -140,34 +276,46 @@ def get_name_puzzle_conditions(generator: BlockGenerator, max_cost: int, safe_mo
         else:
             cost, result = GENERATOR_MOD.run_with_cost(max_cost, block_program, block_program_args)
         npc_list: List[NPC] = []
-        opcodes: Set[bytes] = set(item.value for item in ConditionOpcode)
 
         for res in result.first().as_iter():
-            conditions_list: List[ConditionWithArgs] = []
-
+            # conditions grouped by opcode, in order of first appearance. This is
+            # built directly in the layout NPC stores, with a dict to find the
+            # list for an opcode that was already seen
+            conditions: List[Tuple[ConditionOpcode, List[ConditionWithArgs]]] = []
+            conds_by_op: Dict[ConditionOpcode, List[ConditionWithArgs]] = {}
+
+            # each spend is (parent_id puzzle_hash amount conditions). Walk the
+            # spine once rather than re-deriving every rest() from the head
+            res_rest = res.rest()
+            res_rest_rest = res_rest.rest()
             spent_coin_parent_id: bytes32 = res.first().as_atom()
-            spent_coin_puzzle_hash: bytes32 = res.rest().first().as_atom()
-            spent_coin_amount: uint64 = uint64(res.rest().rest().first().as_int())
+            spent_coin_puzzle_hash: bytes32 = res_rest.first().as_atom()
+            spent_coin_amount: uint64 = uint64(res_rest_rest.first().as_int())
             spent_coin: Coin = Coin(spent_coin_parent_id, spent_coin_puzzle_hash, spent_coin_amount)
 
-            for cond in res.rest().rest().rest().first().as_iter():
-                if cond.first().as_atom() in opcodes:
-                    opcode: ConditionOpcode = ConditionOpcode(cond.first().as_atom())
-                elif not safe_mode:
+            for cond in res_rest_rest.rest().first().as_iter():
+                op_atom, cond_args = _condition_atoms(cond)
+                opcode: Optional[ConditionOpcode] = None
+                if op_atom is not None and len(op_atom) == 1:
+                    opcode = COND_TABLE[op_atom[0]]
+                if opcode is None:
+                    if safe_mode:
+                        return GENERATOR_RUNTIME_ERROR_RESULT
                     opcode = ConditionOpcode.UNKNOWN
-                else:
-                    return NPCResult(uint16(Err.GENERATOR_RUNTIME_ERROR.value), [], uint64(0))
-                cvl = ConditionWithArgs(opcode, cond.rest().as_atom_list())
-                conditions_list.append(cvl)
-            conditions_dict = conditions_by_opcode(conditions_list)
-            if conditions_dict is None:
-                conditions_dict = {}
-            npc_list.append(
-                NPC(spent_coin.name(), spent_coin.puzzle_hash, [(a, b) for a, b in conditions_dict.items()])
-            )
+                cvl = ConditionWithArgs(opcode, cond_args)
+                op_list = conds_by_op.get(opcode)
+                if op_list is None:
+                    op_list = conds_by_op[opcode] = []
+                    conditions.append((opcode, op_list))
+                op_list.append(cvl)
+            coin_name: bytes32 = spent_coin.name()
+            npc_list.append(NPC(coin_name, spent_coin.puzzle_hash, conditions))
         return NPCResult(None, npc_list, uint64(cost))
     except Exception:
-        return NPCResult(uint16(Err.GENERATOR_RUNTIME_ERROR.value), [], uint64(0))
+        # the traceback is only formatted when debug logging is enabled, so
+        # malformed generators stay cheap to reject
+        log.debug("Generator runtime error", exc_info=True)
+        return GENERATOR_RUNTIME_ERROR_RESULT
 
 
 def get_puzzle_and_solution_for_coin(generator: BlockGenerator, coin_name: bytes, max_cost: int):
@@ -199,30 +347,26 @@ def mempool_check_conditions_dict(
     """
     Check all conditions against current state.
     """
-    for con_list in conditions_dict.values():
+    # most spends only create coins, sign and reserve fees, which need no checks
+    if conditions_dict.keys().isdisjoint(CHECKED_OPS):
+        return None
+
+    # walk the conditions in their original order, so the error reported for
+    # a spend with several failing conditions doesn't change
+    for opcode, con_list in conditions_dict.items():
+        handler = HANDLERS.get(opcode)
+        if handler is None:
+            continue
         cvp: ConditionWithArgs
         for cvp in con_list:
-            error: Optional[Err] = None
-            if cvp.opcode is ConditionOpcode.ASSERT_MY_COIN_ID:
-                error = mempool_assert_my_coin_id(cvp, unspent)
-            elif cvp.opcode is ConditionOpcode.ASSERT_COIN_ANNOUNCEMENT:
-                error = mempool_assert_announcement(cvp, coin_announcement_names)
-            elif cvp.opcode is ConditionOpcode.ASSERT_PUZZLE_ANNOUNCEMENT:
-                error = mempool_assert_announcement(cvp, puzzle_announcement_names)
-            elif cvp.opcode is ConditionOpcode.ASSERT_HEIGHT_ABSOLUTE:
-                error = mempool_assert_absolute_block_height_exceeds(cvp, prev_transaction_block_height)
-            elif cvp.opcode is ConditionOpcode.ASSERT_HEIGHT_RELATIVE:
-                error = mempool_assert_relative_block_height_exceeds(cvp, unspent, prev_transaction_block_height)
-            elif cvp.opcode is ConditionOpcode.ASSERT_SECONDS_ABSOLUTE:
-                error = mempool_assert_absolute_time_exceeds(cvp, timestamp)
-            elif cvp.opcode is ConditionOpcode.ASSERT_SECONDS_RELATIVE:
-                error = mempool_assert_relative_time_exceeds(cvp, unspent, timestamp)
-            elif cvp.opcode is ConditionOpcode.ASSERT_MY_PARENT_ID:
-                error = mempool_assert_my_parent_id(cvp, unspent)
-            elif cvp.opcode is ConditionOpcode.ASSERT_MY_PUZZLEHASH:
-                error = mempool_assert_my_puzzlehash(cvp, unspent)
-            elif cvp.opcode is ConditionOpcode.ASSERT_MY_AMOUNT:
-                error = mempool_assert_my_amount(cvp, unspent)
+            error: Optional[Err] = handler(
+                cvp,
+                unspent,
+                coin_announcement_names,
+                puzzle_announcement_names,
+                prev_transaction_block_height,
+                timestamp,
+            )
             if error:
                 return error
 
@@ -30,7 +30,13 @@ class Coin(Streamable):
         return std_hash(self.parent_coin_info + self.puzzle_hash + int_to_bytes(self.amount))
 
     def name(self) -> bytes32:
-        return self.get_hash()
+        # the coin is immutable, so hash it once and keep the result on the
+        # instance. It isn't a dataclass field, so it's never serialized
+        name = self.__dict__.get("_name")
+        if name is None:
+            name = self.get_hash()
+            object.__setattr__(self, "_name", name)
+        return name
 
     def as_list(self) -> List[Any]:
         return [self.parent_coin_info, self.puzzle_hash, self.amount]
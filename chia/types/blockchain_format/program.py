@@ -97,7 +97,9 @@ class Program(SExp):
         If the assumption is wrong, we exit early. This way we never fail
         and always return SOMETHING.
         """
-        items = []
+        items: List[bytes] = []
+        # this runs once per condition, so keep the bound method in a local
+        append = items.append
         obj = self
         while True:
             pair = obj.pair
@@ -106,7 +108,7 @@ class Program(SExp):
             atom = pair[0].atom
             if atom is None:
                 break
-            items.append(atom)
+            append(atom)
             obj = pair[1]
         return items
 
@@ -8,13 +8,19 @@ from chia.types.blockchain_format.program import Program, SerializedProgram
 from chia.types.blockchain_format.sized_bytes import bytes32
 from chia.types.condition_opcodes import ConditionOpcode
 from chia.types.condition_with_args import ConditionWithArgs
-from chia.util.clvm import int_from_bytes
 from chia.util.errors import ConsensusError, Err
 from chia.util.ints import uint64
 
 # TODO: review each `assert` and consider replacing with explicit checks
 #       since asserts can be stripped with python `-OO` flag
 
+# all opcodes are a single byte, so index them by that byte. Classifying a
+# condition is then a list index rather than a hash lookup or an enum call
+COND_TABLE: List[Optional[ConditionOpcode]] = [None] * 256
+for _op in ConditionOpcode:
+    COND_TABLE[_op.value[0]] = _op
+del _op
+
 
 def parse_sexp_to_condition(
     sexp: Program,
@@ -26,12 +32,11 @@ def parse_sexp_to_condition(
     as_atoms = sexp.as_atom_list()
     if len(as_atoms) < 1:
         return Err.INVALID_CONDITION, None
-    opcode = as_atoms[0]
-    try:
-        opcode = ConditionOpcode(opcode)
-    except ValueError:
-        # TODO: this remapping is bad, and should probably not happen
-        # it's simple enough to just store the opcode as a byte
+    # TODO: remapping unknown opcodes is bad, and should probably not happen
+    # it's simple enough to just store the opcode as a byte
+    op_atom = as_atoms[0]
+    opcode: Optional[ConditionOpcode] = COND_TABLE[op_atom[0]] if len(op_atom) == 1 else None
+    if opcode is None:
         opcode = ConditionOpcode.UNKNOWN
     return None, ConditionWithArgs(opcode, as_atoms[1:])
 
@@ -101,7 +106,7 @@ def created_outputs_for_conditions_dict(
         # maybe write a type-checking framework for conditions
         # and don't just fail with asserts
         puzzle_hash, amount_bin = cvp.vars[0], cvp.vars[1]
-        amount = int_from_bytes(amount_bin)
+        amount = int.from_bytes(amount_bin, "big", signed=True)
         coin = Coin(input_coin_name, puzzle_hash, uint64(amount))
         output_coins.append(coin)
     return output_coins
@@ -10,13 +10,25 @@ class StructStream(int):
     Create a class that can parse and stream itself based on a struct.pack template string.
     """
 
+    # the range of values that fit in PACK, computed once per subclass so that
+    # constructing an instance is two comparisons instead of a struct round-trip
+    MINIMUM = 0
+    MAXIMUM_EXCLUSIVE = 0
+
+    def __init_subclass__(cls: Any, **kwargs: Any):
+        super().__init_subclass__(**kwargs)
+        bits = struct.calcsize(cls.PACK) * 8
+        # lower case struct format characters are the signed ones
+        if cls.PACK[-1].islower():
+            cls.MINIMUM = -(2 ** (bits - 1))
+            cls.MAXIMUM_EXCLUSIVE = 2 ** (bits - 1)
+        else:
+            cls.MINIMUM = 0
+            cls.MAXIMUM_EXCLUSIVE = 2 ** bits
+
     def __new__(cls: Any, value: int):
         value = int(value)
-        try:
-            v1 = struct.unpack(cls.PACK, struct.pack(cls.PACK, value))[0]
-            if value != v1:
-                raise ValueError(f"Value {value} does not fit into {cls.__name__}")
-        except Exception:
+        if value < cls.MINIMUM or value >= cls.MAXIMUM_EXCLUSIVE:
             bits = struct.calcsize(cls.PACK) * 8
             raise ValueError(
                 f"Value {value} of size {value.bit_length()} does not fit into " f"{cls.__name__} of size {bits}"
@@ -41,3 +41,21 @@ class TestCoin:
             bytes([0, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF]),
             bytes([0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF]),
         )
+
+    def test_coin_name_cached(self):
+
+        c = Coin(bytes32(b"a" * 32), bytes32(b"b" * 32), uint64(1337))
+        name = c.name()
+        assert name == c.get_hash()
+        # the second call returns the memoized hash
+        assert c.name() is name
+
+        # the cached name is not part of equality or serialization
+        c2 = Coin(bytes32(b"a" * 32), bytes32(b"b" * 32), uint64(1337))
+        assert c2 == c
+        assert hash(c2) == hash(c)
+        f1 = io.BytesIO()
+        c.stream(f1)
+        f2 = io.BytesIO()
+        c2.stream(f2)
+        assert f1.getvalue() == f2.getvalue()